@@ -3,35 +3,70 @@ VAPI Heatmap Visualization Logic
 Shared module for generating 3D and 2D heatmaps from VAPI call data.
 """
 
+import sys
 from collections import Counter
-import plotly.graph_objects as go
 
+import numpy as np
+import plotly.graph_objects as go
 
-def extract_dimensions_from_call(call_info: dict) -> tuple[str, str, str] | None:
-    """Extract the three dimensions from a call info dict."""
-    try:
-        data = call_info.get('data', {})
-        if not data:
-            return None
 
-        caller_type = data.get("caller_type", "unknown")
-        call_summary = data.get("call_summary", {})
-        resolution_type = call_summary.get("resolution_type", "unknown")
-        primary_intent = call_summary.get("primary_intent", "unknown")
+def extract_dimensions_from_call(call_info) -> tuple[str, str, str] | None:
+    """Extract the three dimensions from a CallInfo record.
+
+    Reads the pre-extracted scalar fields so aggregation never touches the
+    on-disk llm_analysis blobs. CallInfo normalizes a missing resolution
+    type to 'no_resolution_type'; this axis keeps its historical 'unknown'
+    label.
+    """
+    resolution_type = call_info.resolution_type
+    if resolution_type == 'no_resolution_type':
+        resolution_type = 'unknown'
+
+    # Intern the categorical values: ~10 unique strings per dimension
+    # regardless of call count, so hashing/equality collapse to pointer
+    # checks and duplicates share one object
+    return (
+        sys.intern(resolution_type or "unknown"),
+        sys.intern(call_info.caller_type or "unknown"),
+        sys.intern(call_info.primary_intent or "unknown"),
+    )
 
-        return (resolution_type or "unknown", caller_type or "unknown", primary_intent or "unknown")
-    except Exception:
-        return None
 
+def aggregate_vapi_data(all_files: list) -> Counter:
+    """Aggregate counts for each (resolution_type, caller_type, primary_intent) combination.
 
-def aggregate_vapi_data(all_files: list) -> dict:
-    """Aggregate counts for each (resolution_type, caller_type, primary_intent) combination."""
-    counts = Counter()
+    Two-phase tally: integer-encode each dimension value on the fly, then
+    count the flattened codes with np.bincount — the hot loop runs in C
+    instead of hashing a 3-tuple of strings per record. The sparse Counter
+    is rebuilt from the nonzero cells for the plotting code.
+    """
+    maps = ({}, {}, {})
+    codes = ([], [], [])
 
     for call_info in all_files:
         dims = extract_dimensions_from_call(call_info)
-        if dims:
-            counts[dims] += 1
+        if dims is None:
+            continue
+        for value, code_map, out in zip(dims, maps, codes):
+            out.append(code_map.setdefault(value, len(code_map)))
+
+    if not codes[0]:
+        return Counter()
+
+    res_codes, caller_codes, intent_codes = (np.asarray(c, dtype=np.int64) for c in codes)
+    n_caller, n_intent = len(maps[1]), len(maps[2])
+
+    flat = (res_codes * n_caller + caller_codes) * n_intent + intent_codes
+    tally = np.bincount(flat, minlength=len(maps[0]) * n_caller * n_intent)
+
+    # Code assignment order matches dict insertion order
+    rev = [list(code_map) for code_map in maps]
+    counts = Counter()
+    for flat_idx in np.flatnonzero(tally):
+        intent_i = flat_idx % n_intent
+        caller_i = (flat_idx // n_intent) % n_caller
+        res_i = flat_idx // (n_intent * n_caller)
+        counts[(rev[0][res_i], rev[1][caller_i], rev[2][intent_i])] = int(tally[flat_idx])
 
     return counts
 
@@ -46,32 +81,25 @@ def create_figure_3d(counts: Counter, min_count: int = 1, dark_mode: bool = Fals
     caller_to_idx = {v: i for i, v in enumerate(caller_types)}
     intent_to_idx = {v: i for i, v in enumerate(primary_intents)}
 
-    x_vals = []
-    y_vals = []
-    z_vals = []
-    sizes = []
-    colors = []
-    hover_texts = []
-
     max_count = max(counts.values()) if counts else 1
 
-    for (res_type, caller_type, intent), count in counts.items():
-        if count >= min_count:
-            x_vals.append(res_to_idx[res_type])
-            y_vals.append(caller_to_idx[caller_type])
-            z_vals.append(intent_to_idx[intent])
+    # Filter once, then build coordinate/marker arrays vectorized
+    visible = [(dims, count) for dims, count in counts.items() if count >= min_count]
+    n = len(visible)
 
-            size = 8 + (count / max_count) * 42
-            sizes.append(size)
-            colors.append(count)
+    x_vals = np.fromiter((res_to_idx[d[0]] for d, _ in visible), dtype=np.int32, count=n)
+    y_vals = np.fromiter((caller_to_idx[d[1]] for d, _ in visible), dtype=np.int32, count=n)
+    z_vals = np.fromiter((intent_to_idx[d[2]] for d, _ in visible), dtype=np.int32, count=n)
+    colors = np.fromiter((count for _, count in visible), dtype=np.int64, count=n)
+    sizes = 8 + colors.astype(np.float32) / max_count * 42
 
-            hover_text = (
-                f"<b>Count: {count}</b><br>"
-                f"Resolution: {res_type}<br>"
-                f"Caller: {caller_type}<br>"
-                f"Intent: {intent}"
-            )
-            hover_texts.append(hover_text)
+    hover_texts = [
+        f"<b>Count: {count}</b><br>"
+        f"Resolution: {res_type}<br>"
+        f"Caller: {caller_type}<br>"
+        f"Intent: {intent}"
+        for (res_type, caller_type, intent), count in visible
+    ]
 
     fig = go.Figure(data=[go.Scatter3d(
         x=x_vals,
@@ -158,21 +186,24 @@ def create_figure_2d(counts: Counter, dim1_idx: int, dim2_idx: int, dim1_name: s
     sorted_d1 = sorted(dim1_vals)
     sorted_d2 = sorted(dim2_vals)
 
-    z_data = [[0] * len(sorted_d1) for _ in range(len(sorted_d2))]
-    text_data = [[""] * len(sorted_d1) for _ in range(len(sorted_d2))]
-
-    # Calculate total for percentages
-    total_count = sum(agg_counts.values())
-
-    for r, d2 in enumerate(sorted_d2):
-        for c, d1 in enumerate(sorted_d1):
-            val = agg_counts.get((d1, d2), 0)
-            z_data[r][c] = val
-            if val > 0:
-                pct = (val / total_count) * 100
-                text_data[r][c] = f"{val}<br>({pct:.1f}%)"
-            else:
-                text_data[r][c] = ""
+    d1_idx = {v: i for i, v in enumerate(sorted_d1)}
+    d2_idx = {v: i for i, v in enumerate(sorted_d2)}
+
+    # Scatter counts into a dense grid, then vectorize the cell labels
+    z_data = np.zeros((len(sorted_d2), len(sorted_d1)), dtype=np.int64)
+    for (v1, v2), val in agg_counts.items():
+        z_data[d2_idx[v2], d1_idx[v1]] = val
+
+    total_count = int(z_data.sum())
+    pct = z_data / total_count * 100 if total_count else np.zeros_like(z_data, dtype=np.float64)
+    text_data = np.where(
+        z_data > 0,
+        np.char.add(
+            z_data.astype(str),
+            np.char.add('<br>(', np.char.add(np.round(pct, 1).astype(str), '%)'))
+        ),
+        ''
+    )
 
     # Theme config
     text_color = '#e0e0e0' if dark_mode else '#333'
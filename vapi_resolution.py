@@ -7,27 +7,50 @@ Usage:
 """
 
 import streamlit as st
+import functools
 import json
+import os
+import pickle
+import sys
 from pathlib import Path
 from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime
-import argparse
+import types
+
+import msgspec
+import numpy as np
+import plotly.graph_objects as go
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import vapi_heatmap
+except ImportError:
+    vapi_heatmap = None
 
 
 def parse_cli_args():
-    """Parse command-line arguments passed after -- in streamlit run command."""
-    try:
-        parser = argparse.ArgumentParser(description='VAPI Resolution Filter UI')
-        parser.add_argument(
-            '-f', '--file',
-            type=str,
-            default='vapi_extracted_calls_analysed_v10.json',
-            help='Path to the JSON file containing analyzed VAPI calls'
-        )
-        args, _ = parser.parse_known_args()
-        return args
-    except Exception:
-        return None
+    """Parse the -f/--file argument passed after -- in streamlit run command.
+
+    A manual scan instead of argparse: the app only has one flag and this
+    runs on every import. Accepts the same spellings argparse did —
+    '-f PATH', '--file PATH', '--file=PATH', and the attached '-fPATH';
+    the last occurrence wins.
+    """
+    file_path = 'vapi_extracted_calls_analysed_v10.json'
+    for i, a in enumerate(sys.argv):
+        if a in ('-f', '--file'):
+            if i + 1 < len(sys.argv):
+                file_path = sys.argv[i + 1]
+        elif a.startswith('--file='):
+            file_path = a[len('--file='):]
+        elif a.startswith('-f') and a != '-f' and not a.startswith('--'):
+            file_path = a[2:]
+    return types.SimpleNamespace(file=file_path)
 
 
 CLI_ARGS = parse_cli_args()
@@ -63,7 +86,9 @@ st.markdown("""
     .json-container,
     .json-container *,
     div[data-testid="stJson"] pre,
-    div[data-testid="stJson"] code {
+    div[data-testid="stJson"] code,
+    div[data-testid="stCode"] pre,
+    div[data-testid="stCode"] code {
         font-size: var(--json-font-size, 14px) !important;
         line-height: 1.6 !important;
     }
@@ -77,191 +102,436 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def get_duration_from_call(call: dict) -> float | None:
-    """Get call duration in seconds from durationSeconds field."""
-    duration = call.get('durationSeconds')
-    if duration is not None:
-        try:
-            return float(duration)
-        except (TypeError, ValueError):
-            pass
+def _coerce_caller_type(value) -> str:
+    """Caller type, defaulting anything missing/non-string to 'unknown'."""
+    return value if value and isinstance(value, str) else 'unknown'
+
+
+def _first_destination(destinations):
+    """First non-empty destination string from a list (or a bare string)."""
+    if isinstance(destinations, list):
+        for d in destinations:
+            if isinstance(d, str) and d:
+                return d
+        return None
+    if isinstance(destinations, str) and destinations:
+        return destinations
     return None
 
 
-@st.cache_data
+def _transfer_success(status):
+    """Collapse a transfer_connection_status list to True/False/None."""
+    if isinstance(status, list):
+        bool_values = [v for v in status if isinstance(v, bool)]
+        if bool_values:
+            return any(bool_values)
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def _pretty(s: str) -> str:
+    """Display label for a snake_case value; cached, the domain is tiny."""
+    return s.replace('_', ' ').title()
+
+
+def _to_rgba(h: str, a: float = 0.4) -> str:
+    return f"rgba({int(h[1:3], 16)}, {int(h[3:5], 16)}, {int(h[5:7], 16)}, {a})"
+
+
+# Sankey node palettes, with 0.4-alpha link variants precomputed once at
+# import so the link-building loops index a list instead of re-parsing hex
+CALLER_TYPE_COLORS = [
+    "#06b6d4", "#8b5cf6", "#f59e0b", "#10b981", "#f43f5e",
+    "#6366f1", "#84cc16", "#ec4899", "#14b8a6", "#a855f7"
+]
+TYPE_COLORS = [
+    "#3b82f6", "#8b5cf6", "#ec4899", "#f59e0b", "#14b8a6",
+    "#6366f1", "#f97316", "#06b6d4", "#84cc16", "#a855f7"
+]
+UNRESOLVED_TYPE_COLORS = [
+    "#dc2626", "#ea580c", "#d97706", "#ca8a04", "#b91c1c",
+    "#c2410c", "#b45309", "#a16207", "#991b1b", "#9a3412"
+]
+SUCCESS_DEST_COLORS = ["#16a34a", "#15803d", "#166534", "#14532d", "#22c55e"]
+FAILED_DEST_COLORS = ["#dc2626", "#b91c1c", "#991b1b", "#7f1d1d", "#ef4444"]
+ACTION_COLORS = [
+    "#0ea5e9", "#a855f7", "#f97316", "#22d3ee", "#e879f9",
+    "#fb923c", "#38bdf8", "#c084fc", "#fdba74"
+]
+CALLER_TYPE_RGBA = [_to_rgba(c) for c in CALLER_TYPE_COLORS]
+TYPE_RGBA = [_to_rgba(c) for c in TYPE_COLORS]
+UNRESOLVED_TYPE_RGBA = [_to_rgba(c) for c in UNRESOLVED_TYPE_COLORS]
+ACTION_RGBA = [_to_rgba(c) for c in ACTION_COLORS]
+
+
+@dataclass(slots=True)
+class CallInfo:
+    """Per-call record kept in memory for filtering and rendering.
+
+    Slotted, so N calls cost attribute storage instead of a 17-key dict
+    apiece, and every hot-path access is a direct slot read.
+    """
+    id: str
+    index: int
+    resolution_type: str
+    caller_type: str
+    final_outcome: str
+    resolution_achieved: bool | None
+    transfer_success: bool | None
+    transfer_destination: str | None
+    secondary_action: str | None
+    primary_intent: str | None
+    transcript_content: str | None
+    call_duration: float | None
+    assistant_id: str
+    squad_id: str
+    has_resolution_type: bool
+    # Location of the full llm_analysis/raw_call JSON in the blob sidecar;
+    # the dicts themselves stay on disk until a call is actually viewed
+    blob_path: str
+    blob_offset: int
+    blob_length: int
+
+
+# Typed schema for the analyzed-call dump. msgspec decodes straight into
+# these slotted structs — no dict per JSON node, fields the app never reads
+# are skipped, and extraction becomes plain attribute access.
+class _CallSummary(msgspec.Struct):
+    resolution_type: str | None = None
+    final_outcome: str | None = None
+    resolution_achieved: bool | None = None
+    secondary_action: str | None = None
+    primary_intent: str | None = None
+
+
+class _TransferContext(msgspec.Struct):
+    transfer_connection_status: list | None = None
+    destinations: list | str | None = None
+
+
+class _LlmAnalysis(msgspec.Struct):
+    caller_type: str | None = None
+    call_summary: _CallSummary | None = None
+    transfer_context: _TransferContext | None = None
+    error: str | None = None
+
+
+class _Call(msgspec.Struct):
+    id: str | None = None
+    transcript: str | None = None
+    durationSeconds: float | None = None
+    assistantId: str | None = None
+    squadId: str | None = None
+    llm_analysis: _LlmAnalysis | None = None
+
+
+_CALLS_DECODER = msgspec.json.Decoder(list[_Call])
+
+
+@dataclass(slots=True)
+class CallColumns:
+    """Integer-coded categorical columns over one dataset of calls.
+
+    Codes are positions in the matching *_values list, assigned in first-
+    occurrence order. The two tri-state fields use 1/0/-1 for
+    True/False/unknown.
+    """
+    resolution_achieved: np.ndarray
+    transfer_success: np.ndarray
+    resolution_type: np.ndarray
+    caller_type: np.ndarray
+    transfer_destination: np.ndarray
+    secondary_action: np.ndarray
+    primary_intent: np.ndarray
+    assistant_id: np.ndarray
+    squad_id: np.ndarray
+    call_duration: np.ndarray  # float64, NaN where missing
+    duration_order: np.ndarray  # int32 argsort of call_duration, NaNs last
+    resolution_type_values: list
+    caller_type_values: list
+    transfer_destination_values: list
+    secondary_action_values: list
+    primary_intent_values: list
+    assistant_id_values: list
+    squad_id_values: list
+
+
+# Bump when the snapshot/blob layout changes so stale sidecars are not loaded
+_SNAPSHOT_VERSION = 6
+
+
+def _sidecar_stem(file_path: str) -> str:
+    stat = os.stat(file_path)
+    return f"{file_path}.{stat.st_mtime:.0f}.{stat.st_size}.v{_SNAPSHOT_VERSION}"
+
+
+def _snapshot_path(file_path: str) -> str:
+    """Sidecar path for the pre-processed snapshot, keyed on source mtime+size."""
+    return _sidecar_stem(file_path) + '.pkl'
+
+
+def _blob_path(file_path: str) -> str:
+    """Sidecar path for the per-call JSON blob index."""
+    return _sidecar_stem(file_path) + '.blobs.jsonl'
+
+
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode()
+
+
+def _loads(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def get_call_data(file_info: CallInfo) -> dict:
+    """Load a call's llm_analysis dict from the blob sidecar on demand."""
+    with open(file_info.blob_path, 'rb') as f:
+        f.seek(file_info.blob_offset)
+        raw = f.read(file_info.blob_length)
+    return _loads(raw)['data']
+
+
+@st.cache_resource
 def load_vapi_data(file_path: str):
-    """Load VAPI call data from JSON file and extract resolution info."""
+    """Load VAPI call data from JSON file and extract resolution info.
+
+    cache_resource rather than cache_data: the result is read-only, and
+    cache_data would pickle-copy the whole record set on every hit, which
+    dwarfs the lookup itself. The processed result is also pickled beside
+    the source file (keyed on its mtime+size), so process restarts with a
+    cold cache skip both the JSON parse and the per-call extraction loop.
+    """
+    snapshot = _snapshot_path(file_path)
+    if os.path.exists(snapshot) and os.path.exists(_blob_path(file_path)):
+        with open(snapshot, 'rb') as f:
+            return pickle.load(f)
+
     json_files = {}
     resolution_types = defaultdict(list)
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        calls = json.load(f)
-
-    for idx, call in enumerate(calls):
-        # Skip calls without llm_analysis or with errors
-        llm_analysis = call.get('llm_analysis')
-        if not llm_analysis or (isinstance(llm_analysis, dict) and 'error' in llm_analysis):
-            continue
-
-        # Extract fields from llm_analysis
-        call_summary = llm_analysis.get('call_summary', {})
-        resolution_type = call_summary.get('resolution_type')
-        final_outcome = call_summary.get('final_outcome', '') or ''
-        resolution_achieved = call_summary.get('resolution_achieved')
-        secondary_action = call_summary.get('secondary_action')
-        primary_intent = call_summary.get('primary_intent')
-
-        caller_type = llm_analysis.get('caller_type', 'unknown')
-        if not caller_type or not isinstance(caller_type, str):
-            caller_type = 'unknown'
-
-        # Extract transfer info
-        transfer_context = llm_analysis.get('transfer_context', {})
-        transfer_destination = None
-        transfer_success = None
-
-        if transfer_context and isinstance(transfer_context, dict):
-            transfer_connection_status = transfer_context.get('transfer_connection_status')
-
-            destinations = transfer_context.get('destinations')
-            if isinstance(destinations, list) and destinations:
-                for d in destinations:
-                    if isinstance(d, str) and d:
-                        transfer_destination = d
-                        break
-            elif isinstance(destinations, str) and destinations:
-                transfer_destination = destinations
-
-            if isinstance(transfer_connection_status, list):
-                if len(transfer_connection_status) == 0:
-                    transfer_success = None
-                else:
-                    bool_values = [v for v in transfer_connection_status if isinstance(v, bool)]
-                    if bool_values:
-                        transfer_success = True if any(bool_values) else False
-                    else:
-                        transfer_success = None
-
-        # Get transcript and convert \n to actual newlines
-        transcript = call.get('transcript', '')
-        if transcript:
-            transcript = transcript.replace('\\n', '\n')
-
-        # Extract call duration from durationSeconds field
-        call_duration = get_duration_from_call(call)
-
-        # Extract assistantId and squadId for filtering
-        assistant_id = call.get('assistantId') or 'unknown'
-        squad_id = call.get('squadId') or 'none'
-
-        # Store file info
-        call_id = call.get('id', f'call_{idx}')
-        file_info = {
-            'id': call_id,
-            'index': idx,
-            'resolution_type': resolution_type or 'no_resolution_type',
-            'caller_type': caller_type,
-            'final_outcome': final_outcome,
-            'resolution_achieved': resolution_achieved,
-            'transfer_success': transfer_success,
-            'transfer_destination': transfer_destination,
-            'secondary_action': secondary_action,
-            'primary_intent': primary_intent,
-            'transcript_content': transcript,
-            'call_duration': call_duration,
-            'assistant_id': assistant_id,
-            'squad_id': squad_id,
-            'data': llm_analysis,
-            'raw_call': call,
-            'has_resolution_type': resolution_type is not None
-        }
-
-        json_files[call_id] = file_info
-        resolution_type_key = resolution_type or 'no_resolution_type'
-        resolution_types[resolution_type_key].append(file_info)
+    with open(file_path, 'rb') as f:
+        raw = f.read()
 
-    return json_files, dict(resolution_types)
+    # Typed decode: one pass straight into slotted structs, no dict per
+    # node. The untyped parse is kept only to write full-fidelity payloads
+    # (unknown fields included) to the blob sidecar.
+    try:
+        typed = _CALLS_DECODER.decode(raw)
+    except msgspec.ValidationError:
+        # Tolerate off-schema field types the way the old dict path did
+        typed = msgspec.convert(_loads(raw), type=list[_Call], strict=False)
+    calls = _loads(raw)
+
+    def _intern(v):
+        # Low-cardinality categoricals collapse to one string object each,
+        # so later group/filter dict lookups are pointer-fast
+        return sys.intern(v) if type(v) is str else v
+
+    # Spill the full llm_analysis/raw_call dicts to a JSONL sidecar and keep
+    # only (offset, length) per call — the nested dicts dominate resident
+    # memory and are only read back when a single call is opened for viewing
+    blob_path = sys.intern(_blob_path(file_path))
+    pos = 0
+    with open(blob_path, 'wb') as bf:
+        for i, call in enumerate(typed):
+            a = call.llm_analysis
+            if a is None or a.error is not None:
+                continue
 
+            payload = _dumps({'data': calls[i].get('llm_analysis'), 'raw_call': calls[i]})
+            bf.write(payload)
+            bf.write(b'\n')
+
+            summary = a.call_summary or _CallSummary()
+            transfer = a.transfer_context or _TransferContext()
+            res_type = summary.resolution_type
+
+            file_info = CallInfo(
+                id=call.id if call.id is not None else f'call_{i}',
+                index=i,
+                resolution_type=sys.intern(res_type or 'no_resolution_type'),
+                caller_type=sys.intern(_coerce_caller_type(a.caller_type)),
+                final_outcome=summary.final_outcome if summary.final_outcome is not None else '',
+                resolution_achieved=summary.resolution_achieved,
+                transfer_success=_transfer_success(transfer.transfer_connection_status),
+                transfer_destination=_intern(_first_destination(transfer.destinations)),
+                secondary_action=_intern(summary.secondary_action),
+                primary_intent=_intern(summary.primary_intent),
+                transcript_content=call.transcript,
+                call_duration=call.durationSeconds,
+                assistant_id=sys.intern(call.assistantId or 'unknown'),
+                squad_id=sys.intern(call.squadId or 'none'),
+                has_resolution_type=res_type is not None,
+                blob_path=blob_path,
+                blob_offset=pos,
+                blob_length=len(payload),
+            )
+            pos += len(payload) + 1
+
+            json_files[file_info.id] = file_info
+            resolution_types[file_info.resolution_type].append(file_info)
+
+    # Columnar (SoA) companion to the records: int-coded categoricals the
+    # Sankey builder and filters can mask/bincount without touching objects
+    columns = _build_columns(list(json_files.values()))
+
+    result = json_files, dict(resolution_types), columns
+    with open(snapshot, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return result
+
+
+def _build_columns(all_files: list) -> CallColumns:
+    """Encode the categorical fields as int codes, one pass per dataset."""
+    n = len(all_files)
+
+    def encode(get):
+        value_map = {}
+        arr = np.fromiter(
+            (value_map.setdefault(get(f), len(value_map)) for f in all_files),
+            dtype=np.int16, count=n)
+        return arr, list(value_map)
+
+    res_codes, res_values = encode(lambda f: f.resolution_type)
+    caller_codes, caller_values = encode(lambda f: f.caller_type)
+    dest_codes, dest_values = encode(lambda f: f.transfer_destination or 'Unknown Destination')
+    action_codes, action_values = encode(lambda f: f.secondary_action or 'no_secondary_action')
+    intent_codes, intent_values = encode(lambda f: f.primary_intent or 'unknown')
+    assistant_codes, assistant_values = encode(lambda f: f.assistant_id)
+    squad_codes, squad_values = encode(lambda f: f.squad_id)
+
+    ra = np.fromiter(
+        (1 if f.resolution_achieved is True else 0 if f.resolution_achieved is False else -1
+         for f in all_files), dtype=np.int8, count=n)
+    ts = np.fromiter(
+        (1 if f.transfer_success is True else 0 if f.transfer_success is False else -1
+         for f in all_files), dtype=np.int8, count=n)
+    durations = np.fromiter(
+        (np.nan if f.call_duration is None else f.call_duration for f in all_files),
+        dtype=np.float64, count=n)
+    duration_order = np.argsort(durations, kind='stable').astype(np.int32)
+
+    return CallColumns(ra, ts, res_codes, caller_codes, dest_codes, action_codes,
+                       intent_codes, assistant_codes, squad_codes, durations,
+                       duration_order,
+                       res_values, caller_values, dest_values, action_values,
+                       intent_values, assistant_values, squad_values)
+
+
+def _group_by_code(idx: np.ndarray, codes: np.ndarray, values: list) -> dict:
+    """Split an index array by category code, preserving first-occurrence order."""
+    sel = codes[idx]
+    uniq, first = np.unique(sel, return_index=True)
+    return {values[c]: idx[sel == c] for c in uniq[np.argsort(first)]}
+
+
+@st.cache_data(show_spinner=False)
+def _build_sankey(files_key, show_resolution_types: bool, split_by_caller_type: bool,
+                  expand_unresolved: bool, show_transfer_outcomes: bool,
+                  show_transfer_destinations: bool, show_secondary_actions: bool,
+                  _all_files: list, _columns: CallColumns):
+    """Build the Sankey figure plus per-link source indices.
+
+    Cached on the data signature and the toggle booleans, so revisiting a
+    previously seen control state skips the whole node/link construction
+    and Plotly figure build. _all_files/_columns are excluded from the
+    cache key (leading underscore); files_key stands in for them.
+    """
+    all_files = _all_files
+    total = len(all_files)
 
-def render_resolution_flow(all_files: list, resolution_types: dict):
-    """Render a Plotly Sankey diagram showing call resolution breakdown."""
-    import plotly.graph_objects as go
+    # Only partitions with an enabled consumer are worth building; each
+    # flag mirrors the gate on the section that reads the bucket below
+    want_type_split = show_resolution_types
+    want_unresolved_split = expand_unresolved
+    want_caller_split = split_by_caller_type
+    want_transfers = show_resolution_types and show_transfer_outcomes
+    want_dests = want_transfers and show_transfer_destinations
+    want_actions = want_transfers and show_secondary_actions
+
+    # Partitions are derived from the int-coded columns with numpy masks
+    # and groupings; buckets hold index arrays into all_files so the
+    # cached payload stays small
+    cols = _columns
+    ra = cols.resolution_achieved
+    res_codes = cols.resolution_type
+
+    by_resolved = {
+        True: np.flatnonzero(ra == 1),
+        False: np.flatnonzero(ra == 0),
+        None: np.flatnonzero(ra == -1),
+    }
 
-    total = len(all_files)
-    if total == 0:
-        st.warning("No data available for Sankey visualization")
-        return
+    type_files = {}             # resolved calls by resolution_type
+    unresolved_type_files = {}  # unresolved calls by resolution_type
+    resolved_by_caller = {}
+    unresolved_by_caller = {}
+    if want_type_split:
+        type_files = _group_by_code(by_resolved[True], res_codes, cols.resolution_type_values)
+    if want_unresolved_split:
+        unresolved_type_files = _group_by_code(by_resolved[False], res_codes, cols.resolution_type_values)
+    if want_caller_split:
+        resolved_by_caller = _group_by_code(by_resolved[True], cols.caller_type, cols.caller_type_values)
+        unresolved_by_caller = _group_by_code(by_resolved[False], cols.caller_type, cols.caller_type_values)
+
+    empty = np.empty(0, dtype=np.int64)
+    transfer_files = empty
+    transfer_by_success = {True: empty, False: empty, None: empty}
+    resolved_transfer_split = {}  # (resolution_type, transfer_success)
+    success_by_dest = {}
+    failed_by_dest = {}
+    success_by_action = {}
+    failed_by_action = {}
+    if want_transfers:
+        transfer_codes = [cols.resolution_type_values.index(t)
+                          for t in ('transfer', 'transfer_attempted')
+                          if t in cols.resolution_type_values]
+        transfer_mask = np.isin(res_codes, transfer_codes)
+        transfer_files = np.flatnonzero(transfer_mask)
+
+        ts_sub = cols.transfer_success[transfer_files]
+        transfer_by_success = {
+            True: transfer_files[ts_sub == 1],
+            False: transfer_files[ts_sub == 0],
+            None: transfer_files[ts_sub == -1],
+        }
 
-    # Calculate resolved vs unresolved
-    resolved_count = sum(1 for f in all_files if f.get('resolution_achieved') is True)
-    unresolved_count = sum(1 for f in all_files if f.get('resolution_achieved') is False)
-    unknown_count = total - resolved_count - unresolved_count
+        for code in transfer_codes:
+            res_type = cols.resolution_type_values[code]
+            base = np.flatnonzero((res_codes == code) & (ra == 1))
+            base_ts = cols.transfer_success[base]
+            for key, tri in ((True, 1), (False, 0), (None, -1)):
+                resolved_transfer_split[(res_type, key)] = base[base_ts == tri]
+
+        if want_dests:
+            success_by_dest = _group_by_code(transfer_by_success[True], cols.transfer_destination,
+                                             cols.transfer_destination_values)
+            failed_by_dest = _group_by_code(transfer_by_success[False], cols.transfer_destination,
+                                            cols.transfer_destination_values)
+        if want_actions:
+            success_by_action = _group_by_code(transfer_by_success[True], cols.secondary_action,
+                                               cols.secondary_action_values)
+            failed_by_action = _group_by_code(transfer_by_success[False], cols.secondary_action,
+                                              cols.secondary_action_values)
+
+    resolved_count = len(by_resolved[True])
+    unresolved_count = len(by_resolved[False])
+    unknown_count = len(by_resolved[None])
 
     resolved_pct = (resolved_count / total * 100) if total else 0
     unresolved_pct = (unresolved_count / total * 100) if total else 0
     unknown_pct = (unknown_count / total * 100) if total else 0
 
-    # Calculate resolution types from resolved calls
-    resolved_files = [f for f in all_files if f.get('resolution_achieved') is True]
-    type_counts = defaultdict(int)
-    type_files = defaultdict(list)
-    for f in resolved_files:
-        res_type = f.get('resolution_type', 'no_resolution_type')
-        type_counts[res_type] += 1
-        type_files[res_type].append(f)
-
-    # Calculate resolution types from UNRESOLVED calls (for expansion)
-    unresolved_files = [f for f in all_files if f.get('resolution_achieved') is False]
-    unresolved_type_counts = defaultdict(int)
-    unresolved_type_files = defaultdict(list)
-    for f in unresolved_files:
-        res_type = f.get('resolution_type', 'no_resolution_type')
-        unresolved_type_counts[res_type] += 1
-        unresolved_type_files[res_type].append(f)
-
-    # Calculate transfer breakdown
-    transfer_files = [f for f in all_files if f.get('resolution_type') in ['transfer', 'transfer_attempted']]
-    transfer_success = sum(1 for f in transfer_files if f.get('transfer_success') is True)
-    transfer_failed = sum(1 for f in transfer_files if f.get('transfer_success') is False)
-    transfer_unknown = len(transfer_files) - transfer_success - transfer_failed
-
-    # Track source files per link
-    link_sources = {}
-    link_index = 0
-
-    # ===== Diagram Controls =====
-    st.markdown("### ⚙️ Diagram Controls")
-
-    # Row 1: Primary splits
-    row1_cols = st.columns(4)
-    with row1_cols[0]:
-        show_resolution_types = st.checkbox("Show Resolution Types", value=True, key="show_res_types",
-                                           help="Show resolution type breakdown for resolved calls")
-    with row1_cols[1]:
-        split_by_caller_type = st.checkbox("Split by Caller Type", value=False, key="split_caller_type",
-                                          help="Show caller type breakdown after resolved/unresolved")
-    with row1_cols[2]:
-        expand_unresolved = st.checkbox("Expand Unresolved", value=False, key="expand_unresolved",
-                                       help="Show resolution types breakdown for unresolved calls")
-    with row1_cols[3]:
-        st.write("")
+    type_counts = {res_type: len(files) for res_type, files in type_files.items()}
+    unresolved_type_counts = {res_type: len(files) for res_type, files in unresolved_type_files.items()}
 
-    # Row 2: Transfer-related options
-    row2_cols = st.columns(4)
-    with row2_cols[0]:
-        show_transfer_outcomes = st.checkbox("Show Transfer Outcomes", value=True, key="show_transfer_outcomes",
-                                            help="Toggle visibility of transfer success/failure breakdown")
-    with row2_cols[1]:
-        show_transfer_destinations = st.checkbox("Show Transfer Destinations", value=False, key="show_transfer_destinations",
-                                                help="Expand transfer outcomes into their destinations")
-    with row2_cols[2]:
-        show_secondary_actions = st.checkbox("Show Secondary Actions", value=False, key="show_secondary_actions",
-                                            help="Show secondary actions taken after transfers",
-                                            disabled=not show_transfer_outcomes)
-    with row2_cols[3]:
-        st.write("")
+    transfer_success = len(transfer_by_success[True])
+    transfer_failed = len(transfer_by_success[False])
+    transfer_unknown = len(transfer_by_success[None])
 
-    st.markdown("---")
+    # Track source files per link (as indices into all_files)
+    link_sources = {}
+    link_index = 0
 
     # ===== Build Sankey diagram =====
     nodes = [f"All Calls ({total})"]
@@ -284,9 +554,9 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
     link_colors = []
     link_labels = []
 
-    resolved_files_list = [f for f in all_files if f.get('resolution_achieved') is True]
-    unresolved_files_list = [f for f in all_files if f.get('resolution_achieved') is False]
-    unknown_files_list = [f for f in all_files if f.get('resolution_achieved') is None]
+    resolved_files_list = by_resolved[True]
+    unresolved_files_list = by_resolved[False]
+    unknown_files_list = by_resolved[None]
 
     if resolved_count > 0:
         sources.append(0)
@@ -317,20 +587,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
 
     # ===== CALLER TYPE SPLIT =====
     if split_by_caller_type:
-        resolved_by_caller = defaultdict(list)
-        unresolved_by_caller = defaultdict(list)
-
-        for f in all_files:
-            ct = f.get('caller_type', 'unknown')
-            if f.get('resolution_achieved') is True:
-                resolved_by_caller[ct].append(f)
-            elif f.get('resolution_achieved') is False:
-                unresolved_by_caller[ct].append(f)
-
-        caller_type_colors = [
-            "#06b6d4", "#8b5cf6", "#f59e0b", "#10b981", "#f43f5e",
-            "#6366f1", "#84cc16", "#ec4899", "#14b8a6", "#a855f7"
-        ]
+        caller_type_colors = CALLER_TYPE_COLORS
 
         resolved_node_idx = 1
         unresolved_node_idx = 2
@@ -339,7 +596,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
             sorted_resolved_callers = sorted(resolved_by_caller.items(), key=lambda x: len(x[1]), reverse=True)
             for idx, (ct, files) in enumerate(sorted_resolved_callers):
                 pct = (len(files) / resolved_count * 100) if resolved_count else 0
-                node_label = f"{ct.replace('_', ' ').title()} ({len(files)}, {pct:.1f}%)"
+                node_label = f"{_pretty(ct)} ({len(files)}, {pct:.1f}%)"
                 ct_node_idx = len(nodes)
                 nodes.append(node_label)
                 color_idx = idx % len(caller_type_colors)
@@ -348,7 +605,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 sources.append(resolved_node_idx)
                 targets.append(ct_node_idx)
                 values.append(len(files))
-                link_colors.append(f"rgba({int(caller_type_colors[color_idx][1:3], 16)}, {int(caller_type_colors[color_idx][3:5], 16)}, {int(caller_type_colors[color_idx][5:7], 16)}, 0.4)")
+                link_colors.append(CALLER_TYPE_RGBA[color_idx])
                 link_sources[link_index] = files
                 link_labels.append(f"Resolved → {ct}: {len(files)}")
                 link_index += 1
@@ -357,7 +614,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
             sorted_unresolved_callers = sorted(unresolved_by_caller.items(), key=lambda x: len(x[1]), reverse=True)
             for idx, (ct, files) in enumerate(sorted_unresolved_callers):
                 pct = (len(files) / unresolved_count * 100) if unresolved_count else 0
-                node_label = f"{ct.replace('_', ' ').title()} ({len(files)}, {pct:.1f}%)"
+                node_label = f"{_pretty(ct)} ({len(files)}, {pct:.1f}%)"
                 ct_node_idx = len(nodes)
                 nodes.append(node_label)
                 color_idx = idx % len(caller_type_colors)
@@ -366,7 +623,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 sources.append(unresolved_node_idx)
                 targets.append(ct_node_idx)
                 values.append(len(files))
-                link_colors.append(f"rgba({int(caller_type_colors[color_idx][1:3], 16)}, {int(caller_type_colors[color_idx][3:5], 16)}, {int(caller_type_colors[color_idx][5:7], 16)}, 0.4)")
+                link_colors.append(CALLER_TYPE_RGBA[color_idx])
                 link_sources[link_index] = files
                 link_labels.append(f"Unresolved → {ct}: {len(files)}")
                 link_index += 1
@@ -376,10 +633,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
     type_node_start = len(nodes)
     sorted_types = sorted(type_counts.items(), key=lambda x: x[1], reverse=True)
 
-    type_colors = [
-        "#3b82f6", "#8b5cf6", "#ec4899", "#f59e0b", "#14b8a6",
-        "#6366f1", "#f97316", "#06b6d4", "#84cc16", "#a855f7"
-    ]
+    type_colors = TYPE_COLORS
 
     transfer_type_indices = []
 
@@ -387,7 +641,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
         for idx, (res_type, count) in enumerate(sorted_types):
             is_transfer = res_type in ['transfer', 'transfer_attempted']
             pct = (count / resolved_count * 100) if resolved_count else 0
-            node_label = f"{res_type.replace('_', ' ').title()} ({count}, {pct:.1f}%)"
+            node_label = f"{_pretty(res_type)} ({count}, {pct:.1f}%)"
             nodes.append(node_label)
 
             color_idx = idx % len(type_colors)
@@ -401,7 +655,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
             sources.append(resolved_node_idx)
             targets.append(type_node_idx)
             values.append(count)
-            link_colors.append(f"rgba({int(type_colors[color_idx][1:3], 16)}, {int(type_colors[color_idx][3:5], 16)}, {int(type_colors[color_idx][5:7], 16)}, 0.4)")
+            link_colors.append(TYPE_RGBA[color_idx])
             link_sources[link_index] = type_files[res_type]
             link_labels.append(f"Resolved → {res_type}: {count}")
             link_index += 1
@@ -412,14 +666,11 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
         unresolved_type_node_start = len(nodes)
         sorted_unresolved_types = sorted(unresolved_type_counts.items(), key=lambda x: x[1], reverse=True)
 
-        unresolved_type_colors = [
-            "#dc2626", "#ea580c", "#d97706", "#ca8a04", "#b91c1c",
-            "#c2410c", "#b45309", "#a16207", "#991b1b", "#9a3412"
-        ]
+        unresolved_type_colors = UNRESOLVED_TYPE_COLORS
 
         for idx, (res_type, count) in enumerate(sorted_unresolved_types):
             pct = (count / unresolved_count * 100) if unresolved_count else 0
-            node_label = f"{res_type.replace('_', ' ').title()} ({count}, {pct:.1f}%)"
+            node_label = f"{_pretty(res_type)} ({count}, {pct:.1f}%)"
             nodes.append(node_label)
 
             color_idx = idx % len(unresolved_type_colors)
@@ -430,7 +681,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
             sources.append(unresolved_node_idx)
             targets.append(unres_type_node_idx)
             values.append(count)
-            link_colors.append(f"rgba({int(unresolved_type_colors[color_idx][1:3], 16)}, {int(unresolved_type_colors[color_idx][3:5], 16)}, {int(unresolved_type_colors[color_idx][5:7], 16)}, 0.4)")
+            link_colors.append(UNRESOLVED_TYPE_RGBA[color_idx])
             link_sources[link_index] = unresolved_type_files[res_type]
             link_labels.append(f"Unresolved → {res_type}: {count}")
             link_index += 1
@@ -441,15 +692,15 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
     failed_pct = (transfer_failed / transfer_total * 100) if transfer_total else 0
     unknown_transfer_pct = (transfer_unknown / transfer_total * 100) if transfer_total else 0
 
-    transfer_success_files = [f for f in transfer_files if f.get('transfer_success') is True]
-    transfer_failed_files = [f for f in transfer_files if f.get('transfer_success') is False]
-    transfer_unknown_files = [f for f in transfer_files if f.get('transfer_success') is None]
+    transfer_success_files = transfer_by_success[True]
+    transfer_failed_files = transfer_by_success[False]
+    transfer_unknown_files = transfer_by_success[None]
 
     success_idx = None
     failed_idx = None
     unknown_idx = None
 
-    if show_resolution_types and show_transfer_outcomes and transfer_files and (transfer_success > 0 or transfer_failed > 0 or transfer_unknown > 0):
+    if show_resolution_types and show_transfer_outcomes and len(transfer_files) and (transfer_success > 0 or transfer_failed > 0 or transfer_unknown > 0):
         if transfer_success > 0:
             success_idx = len(nodes)
             nodes.append(f"Transfer Connected ({transfer_success}, {success_pct:.1f}%)")
@@ -478,12 +729,11 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
             if type_idx is None:
                 continue
 
-            res_type_files = type_files[res_type]
-            success_files = [f for f in res_type_files if f.get('transfer_success') is True]
-            failed_files_list = [f for f in res_type_files if f.get('transfer_success') is False]
-            unknown_files = [f for f in res_type_files if f.get('transfer_success') is None]
+            success_files = resolved_transfer_split[(res_type, True)]
+            failed_files_list = resolved_transfer_split[(res_type, False)]
+            unknown_files = resolved_transfer_split[(res_type, None)]
 
-            if success_files and success_idx is not None:
+            if len(success_files) and success_idx is not None:
                 sources.append(type_idx)
                 targets.append(success_idx)
                 values.append(len(success_files))
@@ -492,7 +742,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 link_labels.append(f"{res_type} → Connected: {len(success_files)}")
                 link_index += 1
 
-            if failed_files_list and failed_idx is not None:
+            if len(failed_files_list) and failed_idx is not None:
                 sources.append(type_idx)
                 targets.append(failed_idx)
                 values.append(len(failed_files_list))
@@ -501,7 +751,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 link_labels.append(f"{res_type} → Failed: {len(failed_files_list)}")
                 link_index += 1
 
-            if unknown_files and unknown_idx is not None:
+            if len(unknown_files) and unknown_idx is not None:
                 sources.append(type_idx)
                 targets.append(unknown_idx)
                 values.append(len(unknown_files))
@@ -511,26 +761,15 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 link_index += 1
 
     # ===== TRANSFER DESTINATION EXPANSION =====
-    if show_transfer_destinations and show_resolution_types and show_transfer_outcomes and transfer_files:
-        success_by_dest = defaultdict(list)
-        failed_by_dest = defaultdict(list)
-
-        for f in transfer_files:
-            dest = f.get('transfer_destination') or 'Unknown Destination'
-            ts = f.get('transfer_success')
-            if ts is True:
-                success_by_dest[dest].append(f)
-            elif ts is False:
-                failed_by_dest[dest].append(f)
-
-        success_dest_colors = ["#16a34a", "#15803d", "#166534", "#14532d", "#22c55e"]
-        failed_dest_colors = ["#dc2626", "#b91c1c", "#991b1b", "#7f1d1d", "#ef4444"]
+    if show_transfer_destinations and show_resolution_types and show_transfer_outcomes and len(transfer_files):
+        success_dest_colors = SUCCESS_DEST_COLORS
+        failed_dest_colors = FAILED_DEST_COLORS
 
         if success_by_dest and success_idx is not None:
             sorted_success_dests = sorted(success_by_dest.items(), key=lambda x: len(x[1]), reverse=True)
             for idx, (dest, files) in enumerate(sorted_success_dests):
                 pct = (len(files) / transfer_success * 100) if transfer_success else 0
-                node_label = f"{dest.replace('_', ' ').title()} ({len(files)}, {pct:.1f}%)"
+                node_label = f"{_pretty(dest)} ({len(files)}, {pct:.1f}%)"
                 dest_node_idx = len(nodes)
                 nodes.append(node_label)
                 node_colors.append(success_dest_colors[idx % len(success_dest_colors)])
@@ -547,7 +786,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
             sorted_failed_dests = sorted(failed_by_dest.items(), key=lambda x: len(x[1]), reverse=True)
             for idx, (dest, files) in enumerate(sorted_failed_dests):
                 pct = (len(files) / transfer_failed * 100) if transfer_failed else 0
-                node_label = f"{dest.replace('_', ' ').title()} ({len(files)}, {pct:.1f}%)"
+                node_label = f"{_pretty(dest)} ({len(files)}, {pct:.1f}%)"
                 dest_node_idx = len(nodes)
                 nodes.append(node_label)
                 node_colors.append(failed_dest_colors[idx % len(failed_dest_colors)])
@@ -561,22 +800,8 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 link_index += 1
 
     # ===== SECONDARY ACTION SPLIT =====
-    if show_secondary_actions and show_resolution_types and show_transfer_outcomes and transfer_files:
-        success_by_action = defaultdict(list)
-        failed_by_action = defaultdict(list)
-
-        for f in transfer_files:
-            sa = f.get('secondary_action') or 'no_secondary_action'
-            ts = f.get('transfer_success')
-            if ts is True:
-                success_by_action[sa].append(f)
-            elif ts is False:
-                failed_by_action[sa].append(f)
-
-        action_colors = [
-            "#0ea5e9", "#a855f7", "#f97316", "#22d3ee", "#e879f9",
-            "#fb923c", "#38bdf8", "#c084fc", "#fdba74"
-        ]
+    if show_secondary_actions and show_resolution_types and show_transfer_outcomes and len(transfer_files):
+        action_colors = ACTION_COLORS
 
         if success_by_action and success_idx is not None:
             sorted_success_actions = sorted(success_by_action.items(), key=lambda x: len(x[1]), reverse=True)
@@ -584,7 +809,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 if action == 'no_secondary_action':
                     continue
                 pct = (len(files) / transfer_success * 100) if transfer_success else 0
-                node_label = f"{action.replace('_', ' ').title()} ({len(files)}, {pct:.1f}%)"
+                node_label = f"{_pretty(action)} ({len(files)}, {pct:.1f}%)"
                 action_node_idx = len(nodes)
                 nodes.append(node_label)
                 color_idx = idx % len(action_colors)
@@ -593,7 +818,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 sources.append(success_idx)
                 targets.append(action_node_idx)
                 values.append(len(files))
-                link_colors.append(f"rgba({int(action_colors[color_idx][1:3], 16)}, {int(action_colors[color_idx][3:5], 16)}, {int(action_colors[color_idx][5:7], 16)}, 0.4)")
+                link_colors.append(ACTION_RGBA[color_idx])
                 link_sources[link_index] = files
                 link_labels.append(f"Connected → {action}: {len(files)}")
                 link_index += 1
@@ -604,7 +829,7 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 if action == 'no_secondary_action':
                     continue
                 pct = (len(files) / transfer_failed * 100) if transfer_failed else 0
-                node_label = f"{action.replace('_', ' ').title()} ({len(files)}, {pct:.1f}%)"
+                node_label = f"{_pretty(action)} ({len(files)}, {pct:.1f}%)"
                 action_node_idx = len(nodes)
                 nodes.append(node_label)
                 color_idx = idx % len(action_colors)
@@ -613,11 +838,15 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
                 sources.append(failed_idx)
                 targets.append(action_node_idx)
                 values.append(len(files))
-                link_colors.append(f"rgba({int(action_colors[color_idx][1:3], 16)}, {int(action_colors[color_idx][3:5], 16)}, {int(action_colors[color_idx][5:7], 16)}, 0.4)")
+                link_colors.append(ACTION_RGBA[color_idx])
                 link_sources[link_index] = files
                 link_labels.append(f"Failed → {action}: {len(files)}")
                 link_index += 1
 
+    # int32 index arrays are ~8x smaller than lists of Python ints and
+    # several buckets alias the same indices, so the cached payload shrinks
+    link_sources = {k: np.asarray(v, dtype=np.int32) for k, v in link_sources.items()}
+
     # Create Sankey diagram
     fig = go.Figure(data=[go.Sankey(
         node=dict(
@@ -629,11 +858,11 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
             hovertemplate='%{label}<extra></extra>'
         ),
         link=dict(
-            source=sources,
-            target=targets,
-            value=values,
+            source=np.asarray(sources, dtype=np.int32),
+            target=np.asarray(targets, dtype=np.int32),
+            value=np.asarray(values, dtype=np.int64),
             color=link_colors,
-            customdata=list(range(len(sources))),
+            customdata=np.arange(len(sources), dtype=np.int32),
             hovertemplate='%{source.label} → %{target.label}<br>Count: %{value}<extra></extra>'
         )
     )])
@@ -644,7 +873,262 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
         paper_bgcolor="rgba(0,0,0,0)",
         plot_bgcolor="rgba(0,0,0,0)",
         height=600,
-        margin=dict(l=20, r=20, t=60, b=20)
+        margin=dict(l=20, r=20, t=60, b=20),
+        # Keep client-side zoom/hover state across reruns that swap the figure
+        uirevision='sankey'
+    )
+
+    return fig, link_labels, link_sources
+
+
+# Upper bound on dropdown entries sent to the browser per rerun
+_SELECT_WINDOW = 200
+
+
+@st.cache_data(show_spinner=False)
+def _heatmap_counts(files_key, _all_files: list):
+    """Aggregate the heatmap counts once per data file.
+
+    Keyed on files_key so view/slider interactions on the heatmap page
+    reuse the Counter instead of re-tallying every call.
+    """
+    return vapi_heatmap.aggregate_vapi_data(_all_files)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _heatmap_figure(files_key, view: str, min_count: int, _all_files: list):
+    """Build (or replay) the heatmap figure for one view/slider setting.
+
+    min_count only masks cells, so stepping the slider back to a value
+    already rendered this session is a cache hit instead of a rebuild.
+    """
+    counts = _heatmap_counts(files_key, _all_files=_all_files)
+    if view == "3D Cube Analysis":
+        return vapi_heatmap.create_figure_3d(counts, min_count=min_count, dark_mode=True)
+    if view == "Resolution vs Caller":
+        return vapi_heatmap.create_figure_2d(counts, 0, 1, "Resolution Type", "Caller Type", "Resolution vs Caller Type", dark_mode=True)
+    if view == "Resolution vs Intent":
+        return vapi_heatmap.create_figure_2d(counts, 0, 2, "Resolution Type", "Primary Intent", "Resolution vs Primary Intent", dark_mode=True)
+    return vapi_heatmap.create_figure_2d(counts, 1, 2, "Caller Type", "Primary Intent", "Caller Type vs Primary Intent", dark_mode=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _display_json(files_key, call_id: str, _call: CallInfo) -> str:
+    """Pretty-printed analysis JSON for the detail pane, cached per call.
+
+    Serialized once per (dataset, call id), so revisiting a call via
+    Prev/Next reuses the string instead of re-reading the blob and
+    re-walking the dict through Streamlit's marshaling; files_key keeps
+    a regenerated data file with reused ids from serving stale entries.
+    """
+    # get_call_data parses the blob fresh, so the dict is ours to extend
+    # in place — no defensive copy before overlaying the extra keys
+    display_data = get_call_data(_call) or {}
+    call_dur = _call.call_duration
+    if call_dur is not None:
+        display_data['_call_duration_seconds'] = round(call_dur, 2)
+        minutes = int(call_dur // 60)
+        seconds = int(call_dur % 60)
+        display_data['_call_duration_formatted'] = f"{minutes}m {seconds}s"
+    display_data['_assistant_id'] = _call.assistant_id
+    display_data['_squad_id'] = _call.squad_id
+    if orjson is not None:
+        return orjson.dumps(display_data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(display_data, indent=2)
+
+
+@st.cache_resource(show_spinner=False)
+def _search_blobs(files_key, _all_files: list) -> dict:
+    """Lowercased searchable text per call, keyed by call id.
+
+    Joining the searched fields once at first use (with a separator that
+    can't appear in a query) means each search is a single substring test
+    per call instead of four .lower() passes over the transcript.
+    """
+    return {
+        f.id: '\x1f'.join((f.id, f.final_outcome, f.caller_type,
+                           f.transcript_content or '')).lower()
+        for f in _all_files
+    }
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _search_matches(files_key, term: str, _all_files: list) -> frozenset:
+    """Ids of calls whose search blob contains the lowercased term.
+
+    Cached per query over the whole corpus (not the filtered subset), so
+    retyping a term or adjusting filters after a search never rescans the
+    transcripts — the display list is a membership test against this set.
+    """
+    blobs = _search_blobs(files_key, _all_files)
+    return frozenset(call_id for call_id, blob in blobs.items() if term in blob)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _sorted_display(files_key, filtered_idx: np.ndarray, search_term: str,
+                    _all_files: list):
+    """Id-sorted display order and selectbox labels for the call browser.
+
+    Keyed on the filter result and search term, so reruns that only move
+    the selection or a font slider reuse the sort and the O(N) label
+    formatting. Returns index positions into _all_files plus the labels.
+    """
+    positions = filtered_idx
+    if search_term:
+        matched = _search_matches(files_key, search_term.lower(), _all_files=_all_files)
+        positions = [i for i in filtered_idx if _all_files[i].id in matched]
+    order = sorted(positions, key=lambda i: _all_files[i].id)
+    options = tuple(f"{_all_files[i].id} ({_all_files[i].caller_type})" for i in order)
+    return np.asarray(order, dtype=np.int32), options
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _filter_calls(files_key, selected_types: tuple, achieved_filter: tuple,
+                  caller_types: tuple, intents: tuple, transfer_filter: tuple,
+                  duration_range: tuple, assistant_ids: tuple, squad_ids: tuple,
+                  _all_files: list, _columns: CallColumns):
+    """Apply the deep-dive filters and aggregate per-dimension counts.
+
+    Cached on the filter selections (passed as tuples), so reruns that only
+    touch unrelated widgets — font sliders, Prev/Next, search — reuse the
+    last result instead of re-scanning every call. The filters themselves
+    are boolean-mask ANDs over the int-coded columns. Returns index
+    positions into _all_files, a counts[dim][value] = (count, duration)
+    mapping, and the total filtered duration.
+    """
+    cols = _columns
+
+    def isin_mask(codes, values, selected):
+        """Mask for a categorical selection; None when it excludes nothing.
+
+        Builds a per-value keep table and gathers it through the code
+        column — one indexed load per call instead of a set probe, so an
+        n-way selection costs the same as a single-value one.
+        """
+        sel = frozenset(selected)
+        if all(v in sel for v in values):
+            return None
+        keep = np.fromiter((v in sel for v in values), dtype=bool, count=len(values))
+        return keep[codes]
+
+    def tri_mask(arr, selected, labels):
+        """Mask for a True/False/None field filtered by its display labels."""
+        sel = frozenset(selected)
+        if all(label in sel for label in labels):
+            return None
+        keep = np.fromiter((code for code, label in zip((1, 0, -1), labels) if label in sel),
+                           dtype=np.int8)
+        return np.isin(arr, keep)
+
+    dur = cols.call_duration
+    dur_lo, dur_hi = duration_range
+    # Two binary searches over the presorted order pick out the range;
+    # NaNs sort last, stay outside the slice, and always pass, matching
+    # the old per-call comparison
+    order = cols.duration_order
+    dur_sorted = dur[order]
+    lo_i = np.searchsorted(dur_sorted, dur_lo, side='left')
+    hi_i = np.searchsorted(dur_sorted, dur_hi, side='right')
+    mask = np.isnan(dur)
+    mask[order[lo_i:hi_i]] = True
+
+    for m in (
+        isin_mask(cols.resolution_type, cols.resolution_type_values, selected_types),
+        tri_mask(cols.resolution_achieved, achieved_filter, ('resolved', 'unresolved', 'unknown')),
+        isin_mask(cols.caller_type, cols.caller_type_values, caller_types),
+        isin_mask(cols.primary_intent, cols.primary_intent_values, intents),
+        tri_mask(cols.transfer_success, transfer_filter, ('successful', 'failed', 'no_transfer')),
+        isin_mask(cols.assistant_id, cols.assistant_id_values, assistant_ids),
+        isin_mask(cols.squad_id, cols.squad_id_values, squad_ids),
+    ):
+        if m is not None:
+            mask &= m
+
+    filtered_idx = np.flatnonzero(mask).astype(np.int32)
+    total_duration = float(np.nansum(dur[mask]))
+
+    # Per-dimension counts and duration sums as paired bincounts over the
+    # filtered codes — one C pass per dimension instead of a Python loop
+    # with a dict probe per (call, dimension) pair
+    dur_weights = np.nan_to_num(dur[filtered_idx])
+
+    def tally(sel, values):
+        n = np.bincount(sel, minlength=len(values))
+        d = np.bincount(sel, weights=dur_weights, minlength=len(values))
+        return {v: (int(n[c]), float(d[c])) for c, v in enumerate(values) if n[c]}
+
+    counts = {
+        'resolution_type': tally(cols.resolution_type[filtered_idx], cols.resolution_type_values),
+        # Tri-state codes (1/0/-1) remap to indices 0/1/2 for bincount
+        'resolution_achieved': tally(1 - cols.resolution_achieved[filtered_idx],
+                                     ('resolved', 'unresolved', 'unknown')),
+        'caller_type': tally(cols.caller_type[filtered_idx], cols.caller_type_values),
+        'primary_intent': tally(cols.primary_intent[filtered_idx], cols.primary_intent_values),
+        'transfer_success': tally(1 - cols.transfer_success[filtered_idx],
+                                  ('successful', 'failed', 'no_transfer')),
+        'assistant_id': tally(cols.assistant_id[filtered_idx], cols.assistant_id_values),
+        'squad_id': tally(cols.squad_id[filtered_idx], cols.squad_id_values),
+    }
+
+    return filtered_idx, counts, total_duration
+
+
+@st.fragment
+def render_resolution_flow(all_files: list, resolution_types: dict, files_key=None,
+                           columns: CallColumns | None = None):
+    """Render a Plotly Sankey diagram showing call resolution breakdown.
+
+    Runs as a fragment: toggling a diagram control reruns only this
+    function, not the whole script.
+    """
+    total = len(all_files)
+    if total == 0:
+        st.warning("No data available for Sankey visualization")
+        return
+
+    if files_key is None:
+        files_key = (total,)
+    if columns is None:
+        columns = _build_columns(all_files)
+
+    # ===== Diagram Controls =====
+    st.markdown("### ⚙️ Diagram Controls")
+
+    # Row 1: Primary splits
+    row1_cols = st.columns(4)
+    with row1_cols[0]:
+        show_resolution_types = st.checkbox("Show Resolution Types", value=True, key="show_res_types",
+                                           help="Show resolution type breakdown for resolved calls")
+    with row1_cols[1]:
+        split_by_caller_type = st.checkbox("Split by Caller Type", value=False, key="split_caller_type",
+                                          help="Show caller type breakdown after resolved/unresolved")
+    with row1_cols[2]:
+        expand_unresolved = st.checkbox("Expand Unresolved", value=False, key="expand_unresolved",
+                                       help="Show resolution types breakdown for unresolved calls")
+    with row1_cols[3]:
+        st.write("")
+
+    # Row 2: Transfer-related options
+    row2_cols = st.columns(4)
+    with row2_cols[0]:
+        show_transfer_outcomes = st.checkbox("Show Transfer Outcomes", value=True, key="show_transfer_outcomes",
+                                            help="Toggle visibility of transfer success/failure breakdown")
+    with row2_cols[1]:
+        show_transfer_destinations = st.checkbox("Show Transfer Destinations", value=False, key="show_transfer_destinations",
+                                                help="Expand transfer outcomes into their destinations")
+    with row2_cols[2]:
+        show_secondary_actions = st.checkbox("Show Secondary Actions", value=False, key="show_secondary_actions",
+                                            help="Show secondary actions taken after transfers",
+                                            disabled=not show_transfer_outcomes)
+    with row2_cols[3]:
+        st.write("")
+
+    st.markdown("---")
+
+    fig, link_labels, link_sources = _build_sankey(
+        files_key, show_resolution_types, split_by_caller_type, expand_unresolved,
+        show_transfer_outcomes, show_transfer_destinations, show_secondary_actions,
+        _all_files=all_files, _columns=columns
     )
 
     st.markdown("## 📊 Resolution Flow Analysis")
@@ -665,22 +1149,22 @@ def render_resolution_flow(all_files: list, resolution_types: dict):
     if selected_flow != flow_options[0]:
         selected_idx = flow_options.index(selected_flow) - 1
         if selected_idx in link_sources:
-            selected_files = link_sources[selected_idx]
+            selected_files = [all_files[i] for i in link_sources[selected_idx]]
             st.markdown(f"**{len(selected_files)} calls** in this flow")
 
             for i, file_info in enumerate(selected_files[:30]):
-                call_id = file_info.get('id', 'Unknown')
+                call_id = file_info.id
 
                 with st.expander(f"📄 Call: {call_id}", expanded=False):
                     tab1, tab2 = st.tabs(["JSON Data", "Transcript"])
 
                     with tab1:
-                        st.json(file_info.get('data', {}))
+                        st.json(get_call_data(file_info))
 
                     with tab2:
-                        transcript = file_info.get('transcript_content')
+                        transcript = file_info.transcript_content
                         if transcript:
-                            st.text_area("Transcript", transcript, height=300, key=f"trans_{i}")
+                            st.text_area("Transcript", transcript.replace('\\n', '\n'), height=300, key=f"trans_{i}")
                         else:
                             st.info("No transcript available.")
 
@@ -715,7 +1199,7 @@ def main():
 
     # Load data
     with st.spinner("Loading VAPI call data..."):
-        json_files, resolution_types = load_vapi_data(file_path)
+        json_files, resolution_types, columns = load_vapi_data(file_path)
 
     if not json_files:
         st.warning("No calls with valid LLM analysis found")
@@ -731,324 +1215,210 @@ def main():
 
     all_files = list(json_files.values())
 
+    # Signature standing in for all_files in cache keys: same file,
+    # same mtime/size, same processed data
+    stat = os.stat(file_path)
+    files_key = (file_path, stat.st_mtime, stat.st_size, len(all_files))
+
     # Page routing
     if page == "📊 Resolution Flow":
-        render_resolution_flow(all_files, resolution_types)
+        render_resolution_flow(all_files, resolution_types, files_key, columns)
         return
 
     if page == "🔥 Heatmap Analysis":
         st.header("🔥 Heatmap Analysis")
         st.info("Explore call data distribution across Resolution, Caller Type, and Primary Intent dimensions.")
-        try:
-            from vapi_heatmap import aggregate_vapi_data, create_figure_3d, create_figure_2d
-
-            col1, col2 = st.columns([1, 3])
-
-            with col1:
-                st.subheader("Visualization Settings")
-                heatmap_view = st.radio(
-                    "Select Dimension View",
-                    ["3D Cube Analysis", "Resolution vs Caller", "Resolution vs Intent", "Caller vs Intent"],
-                    index=0
-                )
-                min_count = st.slider("Minimum Call Count", 1, 10, 1, help="Filter out rare combinations")
-
-                st.markdown("---")
-                st.markdown("### Dimensions Legend")
-                st.markdown("**X-Axis**: Resolution Type")
-                st.markdown("**Y-Axis**: Caller Type")
-                st.markdown("**Z-Axis**: Primary Intent")
-
-            with col2:
-                counts = aggregate_vapi_data(all_files)
-
-                if heatmap_view == "3D Cube Analysis":
-                    fig = create_figure_3d(counts, min_count=min_count, dark_mode=True)
-                    st.plotly_chart(fig, width="stretch", height=700)
-                elif heatmap_view == "Resolution vs Caller":
-                    fig = create_figure_2d(counts, 0, 1, "Resolution Type", "Caller Type", "Resolution vs Caller Type", dark_mode=True)
-                    st.plotly_chart(fig, width="stretch")
-                elif heatmap_view == "Resolution vs Intent":
-                    fig = create_figure_2d(counts, 0, 2, "Resolution Type", "Primary Intent", "Resolution vs Primary Intent", dark_mode=True)
-                    st.plotly_chart(fig, width="stretch")
-                elif heatmap_view == "Caller vs Intent":
-                    fig = create_figure_2d(counts, 1, 2, "Caller Type", "Primary Intent", "Caller Type vs Primary Intent", dark_mode=True)
-                    st.plotly_chart(fig, width="stretch")
-        except ImportError as e:
-            st.error(f"Could not import vapi_heatmap module: {e}")
+        if vapi_heatmap is None:
+            st.error("Could not import vapi_heatmap module")
+            return
+
+        col1, col2 = st.columns([1, 3])
+
+        with col1:
+            st.subheader("Visualization Settings")
+            heatmap_view = st.radio(
+                "Select Dimension View",
+                ["3D Cube Analysis", "Resolution vs Caller", "Resolution vs Intent", "Caller vs Intent"],
+                index=0
+            )
+            min_count = st.slider("Minimum Call Count", 1, 10, 1, help="Filter out rare combinations")
+
+            st.markdown("---")
+            st.markdown("### Dimensions Legend")
+            st.markdown("**X-Axis**: Resolution Type")
+            st.markdown("**Y-Axis**: Caller Type")
+            st.markdown("**Z-Axis**: Primary Intent")
+
+        with col2:
+            fig = _heatmap_figure(files_key, heatmap_view, min_count, _all_files=all_files)
+            if heatmap_view == "3D Cube Analysis":
+                st.plotly_chart(fig, width="stretch", height=700)
+            else:
+                st.plotly_chart(fig, width="stretch")
         return
 
     # ========== ANALYSIS DEEP DIVE VIEW ==========
-    st.sidebar.markdown("---")
-    st.sidebar.header("🔍 Filter by Resolution Type")
-
     all_types = sorted([rt for rt in resolution_types.keys() if rt != 'no_resolution_type'])
     if 'no_resolution_type' in resolution_types:
         all_types.append('no_resolution_type')
 
-    selected_types = st.sidebar.multiselect(
-        "Select resolution types",
-        options=all_types,
-        default=all_types,
-        help="Select one or more resolution types to filter."
-    )
+    # The filter domains are the encoded value lists built at load — no
+    # per-rerun scan over the calls
+    all_caller_types = sorted(columns.caller_type_values)
+    all_intents = sorted(columns.primary_intent_values)
+    all_assistant_ids = sorted(columns.assistant_id_values)
+    all_squad_ids = sorted(columns.squad_id_values)
 
-    st.sidebar.markdown("---")
-    st.sidebar.header("✅ Resolution Achieved")
-    achieved_filter = st.sidebar.multiselect(
-        "Show calls where resolution_achieved is…",
-        options=["resolved", "unresolved", "unknown"],
-        default=["resolved", "unresolved", "unknown"],
-        help="'resolved' = True, 'unresolved' = False, 'unknown' = missing/null."
-    )
+    if np.isnan(columns.call_duration).all():
+        min_dur, max_dur = 0, 600
+    else:
+        min_dur = int(np.nanmin(columns.call_duration))
+        max_dur = int(np.nanmax(columns.call_duration)) + 1
 
-    # Caller type filter
-    all_caller_types = sorted(set(f.get('caller_type', 'unknown') for f in all_files))
+    # All filter widgets live in one form: editing them stages values
+    # without rerunning the script, and the filter pipeline only runs
+    # again when Apply is clicked
     st.sidebar.markdown("---")
-    st.sidebar.header("👤 Filter by Caller Type")
-    selected_caller_types = st.sidebar.multiselect(
-        "Select caller types",
-        options=all_caller_types,
-        default=all_caller_types,
-        help="Filter by caller type."
-    )
+    with st.sidebar.form("filters"):
+        st.header("🔍 Filter by Resolution Type")
+        selected_types = st.multiselect(
+            "Select resolution types",
+            options=all_types,
+            default=all_types,
+            help="Select one or more resolution types to filter."
+        )
 
-    # Primary Intent filter
-    all_intents_set = set()
-    for f in all_files:
-        intent = f.get('primary_intent')
-        all_intents_set.add(intent if intent else 'unknown')
-    all_intents = sorted(all_intents_set)
+        st.markdown("---")
+        st.header("✅ Resolution Achieved")
+        achieved_filter = st.multiselect(
+            "Show calls where resolution_achieved is…",
+            options=["resolved", "unresolved", "unknown"],
+            default=["resolved", "unresolved", "unknown"],
+            help="'resolved' = True, 'unresolved' = False, 'unknown' = missing/null."
+        )
 
-    st.sidebar.markdown("---")
-    st.sidebar.header("🎯 Filter by Primary Intent")
-    selected_intents = st.sidebar.multiselect(
-        "Select primary intents",
-        options=all_intents,
-        default=all_intents,
-        help="Filter by primary intent of the call."
-    )
+        st.markdown("---")
+        st.header("👤 Filter by Caller Type")
+        selected_caller_types = st.multiselect(
+            "Select caller types",
+            options=all_caller_types,
+            default=all_caller_types,
+            help="Filter by caller type."
+        )
 
-    # Transfer Success filter
-    st.sidebar.markdown("---")
-    st.sidebar.header("📞 Transfer Success")
-    transfer_filter = st.sidebar.multiselect(
-        "Show calls where transfer was…",
-        options=["successful", "failed", "no_transfer"],
-        default=["successful", "failed", "no_transfer"],
-        help="'successful' = at least one transfer connected, 'failed' = all transfers failed, 'no_transfer' = no transfer attempted."
-    )
+        st.markdown("---")
+        st.header("🎯 Filter by Primary Intent")
+        selected_intents = st.multiselect(
+            "Select primary intents",
+            options=all_intents,
+            default=all_intents,
+            help="Filter by primary intent of the call."
+        )
 
-    # Call Duration filter
-    st.sidebar.markdown("---")
-    st.sidebar.header("⏱️ Call Duration")
+        st.markdown("---")
+        st.header("📞 Transfer Success")
+        transfer_filter = st.multiselect(
+            "Show calls where transfer was…",
+            options=["successful", "failed", "no_transfer"],
+            default=["successful", "failed", "no_transfer"],
+            help="'successful' = at least one transfer connected, 'failed' = all transfers failed, 'no_transfer' = no transfer attempted."
+        )
 
-    durations = [f.get('call_duration') for f in all_files if f.get('call_duration') is not None]
-    if durations:
-        min_dur = int(min(durations))
-        max_dur = int(max(durations)) + 1
-    else:
-        min_dur, max_dur = 0, 600
+        st.markdown("---")
+        st.header("⏱️ Call Duration")
+        duration_range = st.slider(
+            "Filter by duration (seconds)",
+            min_value=min_dur,
+            max_value=max_dur,
+            value=(min_dur, max_dur),
+            step=10,
+            help="Filter calls based on their duration in seconds."
+        )
 
-    duration_range = st.sidebar.slider(
-        "Filter by duration (seconds)",
-        min_value=min_dur,
-        max_value=max_dur,
-        value=(min_dur, max_dur),
-        step=10,
-        help="Filter calls based on their duration in seconds."
-    )
+        st.markdown("---")
+        st.header("🤖 Filter by Assistant ID")
+        selected_assistant_ids = st.multiselect(
+            "Select assistant IDs",
+            options=all_assistant_ids,
+            default=all_assistant_ids,
+            help="Filter by VAPI assistant ID."
+        )
 
-    # Assistant ID filter
-    all_assistant_ids = sorted(set(f.get('assistant_id', 'unknown') for f in all_files))
-    st.sidebar.markdown("---")
-    st.sidebar.header("🤖 Filter by Assistant ID")
-    selected_assistant_ids = st.sidebar.multiselect(
-        "Select assistant IDs",
-        options=all_assistant_ids,
-        default=all_assistant_ids,
-        help="Filter by VAPI assistant ID."
-    )
+        st.markdown("---")
+        st.header("👥 Filter by Squad ID")
+        selected_squad_ids = st.multiselect(
+            "Select squad IDs",
+            options=all_squad_ids,
+            default=all_squad_ids,
+            help="Filter by VAPI squad ID."
+        )
 
-    # Squad ID filter
-    all_squad_ids = sorted(set(f.get('squad_id', 'none') for f in all_files))
-    st.sidebar.markdown("---")
-    st.sidebar.header("👥 Filter by Squad ID")
-    selected_squad_ids = st.sidebar.multiselect(
-        "Select squad IDs",
-        options=all_squad_ids,
-        default=all_squad_ids,
-        help="Filter by VAPI squad ID."
-    )
+        st.form_submit_button("Apply Filters", width="stretch")
 
-    # Filter functions
-    def matches_resolution_type(f, res_types):
-        return f.get('resolution_type', 'no_resolution_type') in res_types
-
-    def matches_achieved(f, achieved_list):
-        val = f.get("resolution_achieved")
-        if val is True:
-            return "resolved" in achieved_list
-        if val is False:
-            return "unresolved" in achieved_list
-        return "unknown" in achieved_list
-
-    def matches_caller_type(f, caller_types):
-        return f.get('caller_type', 'unknown') in caller_types
-
-    def matches_primary_intent(f, intent_list):
-        val = f.get('primary_intent') or 'unknown'
-        return val in intent_list
-
-    def matches_transfer_success(f, transfer_list):
-        val = f.get("transfer_success")
-        if val is True:
-            return "successful" in transfer_list
-        if val is False:
-            return "failed" in transfer_list
-        return "no_transfer" in transfer_list
-
-    def matches_duration(f, dur_range):
-        dur = f.get('call_duration')
-        if dur is None:
-            return True  # Include calls without duration
-        return dur_range[0] <= dur <= dur_range[1]
-
-    def matches_assistant_id(f, assistant_ids):
-        return f.get('assistant_id', 'unknown') in assistant_ids
-
-    def matches_squad_id(f, squad_ids):
-        return f.get('squad_id', 'none') in squad_ids
-
-    # Apply filters
-    filtered_files = [
-        f for f in all_files
-        if matches_resolution_type(f, selected_types)
-        and matches_achieved(f, achieved_filter)
-        and matches_caller_type(f, selected_caller_types)
-        and matches_primary_intent(f, selected_intents)
-        and matches_transfer_success(f, transfer_filter)
-        and matches_duration(f, duration_range)
-        and matches_assistant_id(f, selected_assistant_ids)
-        and matches_squad_id(f, selected_squad_ids)
-    ]
-
-    total_filtered = len(filtered_files)
+    # Apply filters; cached on the selection tuples, so unrelated reruns
+    # (font sliders, pagination, search) skip the whole scan
+    filtered_idx, dim_counts, total_duration = _filter_calls(
+        files_key, tuple(selected_types), tuple(achieved_filter),
+        tuple(selected_caller_types), tuple(selected_intents), tuple(transfer_filter),
+        tuple(duration_range), tuple(selected_assistant_ids), tuple(selected_squad_ids),
+        _all_files=all_files, _columns=columns
+    )
+    total_filtered = len(filtered_idx)
     total_all = len(all_files)
 
-    # Calculate total duration for duration percentages
-    total_duration = sum(f.get('call_duration', 0) or 0 for f in filtered_files)
-
     # ========== DYNAMIC COUNTS WITH PERCENTAGES ==========
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 📊 Dynamic Counts")
 
+    def dim_caption(dim: str, value: str, display: str | None = None):
+        count, dur = dim_counts[dim].get(value, (0, 0.0))
+        pct = (count / total_filtered * 100) if total_filtered else 0.0
+        dur_pct = (dur / total_duration * 100) if total_duration else 0.0
+        st.caption(f"✓ {display or value}: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+
     # Resolution Type counts
     with st.sidebar.expander(f"🏷️ Resolution Type ({len(selected_types)} selected)", expanded=False):
         for res_type in all_types:
             if res_type in selected_types:
-                matching = [f for f in filtered_files if f.get('resolution_type', 'no_resolution_type') == res_type]
-                count = len(matching)
-                pct = (count / total_filtered * 100) if total_filtered else 0.0
-                dur = sum(f.get('call_duration', 0) or 0 for f in matching)
-                dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-                st.caption(f"✓ {res_type}: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+                dim_caption('resolution_type', res_type)
 
     # Resolution Achieved counts
     with st.sidebar.expander(f"✅ Resolution Achieved ({len(achieved_filter)} selected)", expanded=False):
-        resolved_files = [f for f in filtered_files if f.get("resolution_achieved") is True]
-        unresolved_files = [f for f in filtered_files if f.get("resolution_achieved") is False]
-        unknown_files = [f for f in filtered_files if f.get("resolution_achieved") is None]
-
-        if 'resolved' in achieved_filter:
-            count = len(resolved_files)
-            pct = (count / total_filtered * 100) if total_filtered else 0.0
-            dur = sum(f.get('call_duration', 0) or 0 for f in resolved_files)
-            dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-            st.caption(f"✓ resolved: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
-        if 'unresolved' in achieved_filter:
-            count = len(unresolved_files)
-            pct = (count / total_filtered * 100) if total_filtered else 0.0
-            dur = sum(f.get('call_duration', 0) or 0 for f in unresolved_files)
-            dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-            st.caption(f"✓ unresolved: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
-        if 'unknown' in achieved_filter:
-            count = len(unknown_files)
-            pct = (count / total_filtered * 100) if total_filtered else 0.0
-            dur = sum(f.get('call_duration', 0) or 0 for f in unknown_files)
-            dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-            st.caption(f"✓ unknown: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+        for label in ('resolved', 'unresolved', 'unknown'):
+            if label in achieved_filter:
+                dim_caption('resolution_achieved', label)
 
     # Caller Type counts
     with st.sidebar.expander(f"👤 Caller Type ({len(selected_caller_types)} selected)", expanded=False):
         for caller_type in all_caller_types:
             if caller_type in selected_caller_types:
-                matching = [f for f in filtered_files if f.get('caller_type', 'unknown') == caller_type]
-                count = len(matching)
-                pct = (count / total_filtered * 100) if total_filtered else 0.0
-                dur = sum(f.get('call_duration', 0) or 0 for f in matching)
-                dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-                st.caption(f"✓ {caller_type}: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+                dim_caption('caller_type', caller_type)
 
     # Primary Intent counts
     with st.sidebar.expander(f"🎯 Primary Intent ({len(selected_intents)} selected)", expanded=False):
         for intent in all_intents:
             if intent in selected_intents:
-                matching = [f for f in filtered_files if (f.get('primary_intent') or 'unknown') == intent]
-                count = len(matching)
-                pct = (count / total_filtered * 100) if total_filtered else 0.0
-                dur = sum(f.get('call_duration', 0) or 0 for f in matching)
-                dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-                st.caption(f"✓ {intent}: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+                dim_caption('primary_intent', intent)
 
     # Transfer Success counts
     with st.sidebar.expander(f"📞 Transfer Success ({len(transfer_filter)} selected)", expanded=False):
-        success_files = [f for f in filtered_files if f.get("transfer_success") is True]
-        failed_files = [f for f in filtered_files if f.get("transfer_success") is False]
-        no_transfer_files = [f for f in filtered_files if f.get("transfer_success") is None]
-
-        if 'successful' in transfer_filter:
-            count = len(success_files)
-            pct = (count / total_filtered * 100) if total_filtered else 0.0
-            dur = sum(f.get('call_duration', 0) or 0 for f in success_files)
-            dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-            st.caption(f"✓ successful: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
-        if 'failed' in transfer_filter:
-            count = len(failed_files)
-            pct = (count / total_filtered * 100) if total_filtered else 0.0
-            dur = sum(f.get('call_duration', 0) or 0 for f in failed_files)
-            dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-            st.caption(f"✓ failed: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
-        if 'no_transfer' in transfer_filter:
-            count = len(no_transfer_files)
-            pct = (count / total_filtered * 100) if total_filtered else 0.0
-            dur = sum(f.get('call_duration', 0) or 0 for f in no_transfer_files)
-            dur_pct = (dur / total_duration * 100) if total_duration else 0.0
-            st.caption(f"✓ no_transfer: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+        for label in ('successful', 'failed', 'no_transfer'):
+            if label in transfer_filter:
+                dim_caption('transfer_success', label)
 
     # Assistant ID counts
     with st.sidebar.expander(f"🤖 Assistant ID ({len(selected_assistant_ids)} selected)", expanded=False):
         for assistant_id in all_assistant_ids:
             if assistant_id in selected_assistant_ids:
-                matching = [f for f in filtered_files if f.get('assistant_id', 'unknown') == assistant_id]
-                count = len(matching)
-                pct = (count / total_filtered * 100) if total_filtered else 0.0
-                dur = sum(f.get('call_duration', 0) or 0 for f in matching)
-                dur_pct = (dur / total_duration * 100) if total_duration else 0.0
                 display_id = assistant_id[:12] + '...' if len(assistant_id) > 15 else assistant_id
-                st.caption(f"✓ {display_id}: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+                dim_caption('assistant_id', assistant_id, display_id)
 
     # Squad ID counts
     with st.sidebar.expander(f"👥 Squad ID ({len(selected_squad_ids)} selected)", expanded=False):
         for squad_id in all_squad_ids:
             if squad_id in selected_squad_ids:
-                matching = [f for f in filtered_files if f.get('squad_id', 'none') == squad_id]
-                count = len(matching)
-                pct = (count / total_filtered * 100) if total_filtered else 0.0
-                dur = sum(f.get('call_duration', 0) or 0 for f in matching)
-                dur_pct = (dur / total_duration * 100) if total_duration else 0.0
                 display_id = squad_id[:12] + '...' if len(squad_id) > 15 else squad_id
-                st.caption(f"✓ {display_id}: {count} ({pct:.1f}%, {dur_pct:.1f}% dur)")
+                dim_caption('squad_id', squad_id, display_id)
 
     st.sidebar.markdown("---")
     st.sidebar.metric("Filtered Calls", f"{total_filtered} / {total_all}")
@@ -1082,45 +1452,42 @@ def main():
     )
     st.session_state.json_font_size = json_font_size
 
-    st.markdown(f"""
-    <style>
-        :root {{
-            --transcript-font-size: {transcript_font_size}px;
-            --json-font-size: {json_font_size}px;
-        }}
-    </style>
-    """, unsafe_allow_html=True)
-
-    if not filtered_files:
+    # The stylesheet falls back to 14px, so the override block is only
+    # injected once a slider leaves the default; while both sit at 14 no
+    # style node is shipped or recomputed per rerun. (It can't be gated
+    # on "value changed" — elements skipped on a rerun are removed, which
+    # would snap custom sizes back to the default.)
+    if transcript_font_size != 14 or json_font_size != 14:
+        st.markdown(f"""
+        <style>
+            :root {{
+                --transcript-font-size: {transcript_font_size}px;
+                --json-font-size: {json_font_size}px;
+            }}
+        </style>
+        """, unsafe_allow_html=True)
+
+    if not total_filtered:
         st.warning("No calls match the selected filters")
         return
 
-    # Sort by ID
-    filtered_files.sort(key=lambda x: x.get('id', ''))
-
     # Search
     st.markdown("---")
     search_term = st.text_input("🔍 Search calls", "", key="call_search")
 
-    display_files = filtered_files
-    if search_term:
-        display_files = [
-            f for f in filtered_files
-            if search_term.lower() in f.get('id', '').lower()
-            or search_term.lower() in f.get('final_outcome', '').lower()
-            or search_term.lower() in f.get('caller_type', '').lower()
-            or search_term.lower() in (f.get('transcript_content', '') or '').lower()
-        ]
+    # Sorted id order and selectbox labels are memoized on the filter
+    # result + search term, so Prev/Next clicks and font-slider drags
+    # reuse them instead of re-sorting and re-formatting O(N) labels
+    display_order, file_options = _sorted_display(
+        files_key, filtered_idx, search_term, _all_files=all_files)
+    display_files = [all_files[i] for i in display_order]
 
     if not display_files:
         st.info("No calls match your search")
         return
 
-    # File selector
-    file_options = [f"{f.get('id')} ({f.get('caller_type', 'unknown')})" for f in display_files]
-
     # Calculate total duration for displayed files
-    total_display_duration = sum(f.get('call_duration', 0) or 0 for f in display_files)
+    total_display_duration = float(np.nansum(columns.call_duration[display_order]))
     hours = int(total_display_duration // 3600)
     minutes = int((total_display_duration % 3600) // 60)
     seconds = int(total_display_duration % 60)
@@ -1131,57 +1498,74 @@ def main():
     else:
         duration_str = f"{seconds}s"
 
+    n_display = len(display_files)
+    pos = st.session_state.get('call_position', 0)
+    if pos >= n_display:
+        pos = 0
+
+    # Only a window of options goes to the browser: rendering thousands
+    # of dropdown entries dominates page weight, and anything outside the
+    # window is reachable via Position or the id jump below
+    half = _SELECT_WINDOW // 2
+    win_lo = max(0, min(pos - half, n_display - _SELECT_WINDOW))
+    win_hi = min(n_display, win_lo + _SELECT_WINDOW)
+
     file_col1, file_col2, file_col2b, file_col2c, file_col3, file_col4 = st.columns([3, 1.2, 1.4, 1.2, 1, 1])
 
     with file_col1:
-        selected_idx = st.selectbox("Select a call", range(len(file_options)), format_func=lambda i: file_options[i], label_visibility="visible")
+        selected_idx = st.selectbox("Select a call", range(win_lo, win_hi), index=pos - win_lo, format_func=lambda i: file_options[i], label_visibility="visible")
+        if selected_idx != pos:
+            pos = st.session_state['call_position'] = selected_idx
+
+        jump_id = st.text_input("🎯 Jump to call ID", "", key="call_jump")
+        # Only act when the typed id changes; while the text sits in the
+        # box, reruns (Prev/Next, sliders, search) must not re-apply it
+        if jump_id != st.session_state.get('call_jump_applied', ''):
+            st.session_state['call_jump_applied'] = jump_id
+            if jump_id:
+                jump_pos = next((i for i, f in enumerate(display_files) if f.id == jump_id.strip()), None)
+                if jump_pos is not None and jump_pos != pos:
+                    pos = st.session_state['call_position'] = jump_pos
 
     with file_col2:
-        st.metric("Calls", f"{len(display_files)} / {len(filtered_files)}")
+        st.metric("Calls", f"{n_display} / {total_filtered}")
 
     with file_col2b:
         st.metric("Total Duration", duration_str)
 
     with file_col2c:
-        st.metric("Position", f"{selected_idx + 1} / {len(display_files)}")
+        go_to = st.number_input("Position", min_value=1, max_value=n_display, value=pos + 1, help=f"1–{n_display}")
+        if go_to - 1 != pos:
+            pos = st.session_state['call_position'] = go_to - 1
 
     with file_col3:
-        if st.button("◀ Prev", use_container_width=True) and selected_idx > 0:
-            selected_idx -= 1
+        if st.button("◀ Prev", use_container_width=True) and pos > 0:
+            pos = st.session_state['call_position'] = pos - 1
 
     with file_col4:
-        if st.button("Next ▶", use_container_width=True) and selected_idx < len(display_files) - 1:
-            selected_idx += 1
+        if st.button("Next ▶", use_container_width=True) and pos < n_display - 1:
+            pos = st.session_state['call_position'] = pos + 1
 
     st.markdown("---")
 
     # Display selected call
     if display_files:
-        selected_call = display_files[selected_idx]
+        selected_call = display_files[pos]
 
         col_txt, col_json = st.columns(2)
 
         with col_txt:
             st.markdown("### 📝 Transcript")
-            transcript = selected_call.get('transcript_content', '')
+            transcript = selected_call.transcript_content
             if transcript:
-                st.text_area("Transcript", value=transcript, height=700, disabled=True, label_visibility="collapsed")
+                st.text_area("Transcript", value=transcript.replace('\\n', '\n'), height=700, disabled=True, label_visibility="collapsed")
             else:
                 st.info("No transcript available")
 
         with col_json:
             st.markdown("### 📊 LLM Analysis")
-            # Add duration to displayed data
-            display_data = selected_call.get('data', {}).copy() if selected_call.get('data') else {}
-            call_dur = selected_call.get('call_duration')
-            if call_dur is not None:
-                display_data['_call_duration_seconds'] = round(call_dur, 2)
-                minutes = int(call_dur // 60)
-                seconds = int(call_dur % 60)
-                display_data['_call_duration_formatted'] = f"{minutes}m {seconds}s"
-            display_data['_assistant_id'] = selected_call.get('assistant_id', 'unknown')
-            display_data['_squad_id'] = selected_call.get('squad_id', 'none')
-            st.json(display_data)
+            # Duration and routing ids are merged into the serialized blob
+            st.code(_display_json(files_key, selected_call.id, selected_call), language='json', height=700)
 
 
 if __name__ == "__main__":